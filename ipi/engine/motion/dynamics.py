@@ -10,6 +10,9 @@ appropriate conserved energy quantity for the ensemble of choice.
 # i-PI Copyright (C) 2014-2015 i-PI developers
 # See the "licenses" directory for full license information.
 
+from functools import partial
+from itertools import groupby
+
 import numpy as np
 
 from ipi.engine.motion import Motion
@@ -18,6 +21,13 @@ from ipi.engine.thermostats import Thermostat
 from ipi.engine.barostats import Barostat
 from ipi.utils.softexit import softexit
 
+# tries to import the BLAS daxpy from scipy, to do the momentum updates in a
+# single pass, but falls back on numpy if it's not there
+try:
+    from scipy.linalg.blas import daxpy
+except ImportError:
+    daxpy = None
+
 
 # __all__ = ['Dynamics', 'NVEIntegrator', 'NVTIntegrator', 'NPTIntegrator', 'NSTIntegrator', 'SCIntegrator`']
 
@@ -77,8 +87,10 @@ class Dynamics(Motion):
             self.thermostat = Thermostat()
         else:
             if (
-                thermostat.__class__.__name__ is ("ThermoPILE_G" or "ThermoNMGLEG ")
-            ) and (len(fixatoms) > 0):
+                thermostat.__class__.__name__ in ("ThermoPILE_G", "ThermoNMGLEG")
+                and fixatoms is not None
+                and len(fixatoms) > 0
+            ):
                 softexit.trigger(
                     "!! Sorry, fixed atoms and global thermostat on the centroid not supported. Use a local thermostat. !!"
                 )
@@ -257,11 +269,7 @@ class DummyIntegrator(dobject):
         return self.dt * 0.5 / self.inmts
 
     def get_pdt(self):
-        dtl = 1.0 / self.nmts
-        for i in range(1, len(dtl)):
-            dtl[i] *= dtl[i - 1]
-        dtl *= self.dt * 0.5
-        return dtl
+        return np.cumprod(1.0 / dstrip(self.nmts)) * (self.dt * 0.5)
 
     def get_tdt(self):
         if self.splitting == "obabo":
@@ -273,6 +281,9 @@ class DummyIntegrator(dobject):
                 "Invalid splitting requested. Only OBABO and BAOAB are supported."
             )
 
+    def get_qdt_on_m(self):
+        return self.qdt / dstrip(self.m3_row0)
+
     def bind(self, motion):
         """ Reference all the variables for simpler access."""
 
@@ -286,6 +297,8 @@ class DummyIntegrator(dobject):
         self.barostat = motion.barostat
         self.fixcom = motion.fixcom
         self.fixatoms = motion.fixatoms
+        # indices of all the Cartesian components of the fixed atoms
+        self._fixidx = (3 * self.fixatoms[:, np.newaxis] + np.arange(3)).flatten()
         self.enstype = motion.enstype
 
         dself = dd(self)
@@ -297,8 +310,15 @@ class DummyIntegrator(dobject):
         dself.nmts = dmotion.nmts
 
         # total number of iteration in the inner-most MTS loop
-        dself.inmts = depend_value(name="inmts", func=lambda: np.prod(self.nmts))
-        dself.nmtslevels = depend_value(name="nmtslevels", func=lambda: len(self.nmts))
+        # plain ints, which only need to be recomputed when nmts changes
+        dself.inmts = depend_value(
+            name="inmts",
+            func=lambda: int(np.prod(dstrip(self.nmts))),
+            dependencies=[dself.nmts],
+        )
+        dself.nmtslevels = depend_value(
+            name="nmtslevels", func=lambda: len(self.nmts), dependencies=[dself.nmts]
+        )
         # these are the time steps to be used for the different parts of the integrator
         dself.qdt = depend_value(
             name="qdt",
@@ -316,6 +336,18 @@ class DummyIntegrator(dobject):
             func=self.get_tdt,
             dependencies=[dself.splitting, dself.dt, dself.nmts],
         )  # thermostat
+        dself.m3_row0 = depend_array(
+            name="m3_row0",
+            func=lambda: dstrip(self.beads.m3)[0],
+            value=np.zeros(3 * self.beads.natoms),
+            dependencies=[dd(self.beads).m3],
+        )  # masses of the first bead, one per Cartesian component
+        dself.qdt_on_m = depend_array(
+            name="qdt_on_m",
+            func=self.get_qdt_on_m,
+            value=np.zeros(3 * self.beads.natoms),
+            dependencies=[dself.qdt, dself.m3_row0],
+        )  # centroid position update, qdt/m
 
         dpipe(dself.qdt, dd(self.nm).dt)
         dpipe(dself.dt, dd(self.barostat).dt)
@@ -332,15 +364,30 @@ class DummyIntegrator(dobject):
 
     def pstep(self):
         """Dummy momenta propagator which does nothing."""
-        pass
+
+    def pkick(self, dp, scale=1.0):
+        """Adds scale*dp to the bead momenta, in place.
+
+        Does the same as self.beads.p += dp * scale, but rather than setting the
+        updated momenta back into the depend array (which copies them onto
+        themselves) it just flags them as manually changed. If scipy is
+        available, the scaled update is done in a single pass with daxpy.
+        """
+
+        p = dstrip(self.beads.p)
+        if daxpy is not None:
+            daxpy(dstrip(dp).ravel(), p.reshape(-1), a=scale)
+        elif scale == 1.0:
+            p += dp
+        else:
+            p += dp * scale
+        dd(self.beads).p.update_man()
 
     def qcstep(self):
         """Dummy centroid position propagator which does nothing."""
-        pass
 
     def step(self, step=None):
         """Dummy simulation time step which does nothing."""
-        pass
 
     def pconstraints(self):
         """This removes the centre of mass contribution to the kinetic energy.
@@ -356,39 +403,28 @@ class DummyIntegrator(dobject):
         """
 
         if self.fixcom:
-            na3 = self.beads.natoms * 3
             nb = self.beads.nbeads
             p = dstrip(self.beads.p)
-            m = dstrip(self.beads.m3)[:, 0:na3:3]
+            m = dstrip(self.beads.m)
             M = self.beads[0].M
             Mnb = M * nb
 
-            dens = 0
-            for i in range(3):
-                pcom = p[:, i:na3:3].sum()
-                dens += pcom ** 2
-                pcom /= Mnb
-                self.beads.p[:, i:na3:3] -= m * pcom
+            # views p as (nbeads, natoms, 3) so the three components are
+            # reduced together, and the momenta are written back just once
+            pcom = p.reshape((nb, -1, 3)).sum(axis=(0, 1))
+            dens = np.dot(pcom, pcom)
+            pcom /= Mnb
+            self.beads.p -= np.outer(m, pcom).flatten()
 
             self.ensemble.eens += dens * 0.5 / Mnb
 
         if len(self.fixatoms) > 0:
-            for bp in self.beads.p:
-                m = dstrip(self.beads.m)
-                self.ensemble.eens += 0.5 * np.dot(
-                    bp[self.fixatoms * 3], bp[self.fixatoms * 3] / m[self.fixatoms]
-                )
-                self.ensemble.eens += 0.5 * np.dot(
-                    bp[self.fixatoms * 3 + 1],
-                    bp[self.fixatoms * 3 + 1] / m[self.fixatoms],
-                )
-                self.ensemble.eens += 0.5 * np.dot(
-                    bp[self.fixatoms * 3 + 2],
-                    bp[self.fixatoms * 3 + 2] / m[self.fixatoms],
-                )
-                bp[self.fixatoms * 3] = 0.0
-                bp[self.fixatoms * 3 + 1] = 0.0
-                bp[self.fixatoms * 3 + 2] = 0.0
+            nb = self.beads.nbeads
+            m = dstrip(self.beads.m)
+            # gathers the (contiguous) momentum triplets of the fixed atoms
+            pfix = dstrip(self.beads.p).reshape((nb, -1, 3))[:, self.fixatoms]
+            self.ensemble.eens += 0.5 * np.sum(pfix ** 2 / m[self.fixatoms, np.newaxis])
+            self.beads.p[:, self._fixidx] = 0.0
 
 
 class NVEIntegrator(DummyIntegrator):
@@ -409,91 +445,175 @@ class NVEIntegrator(DummyIntegrator):
             potential energy, and the spring potential energy.
     """
 
-    def pstep(self, level=0):
-        """Velocity Verlet momentum propagator."""
+    # consecutive momentum steps at the same MTS level can be merged into one
+    merge_psteps = True
+    # consecutive (linear) position steps can be merged into one
+    merge_qsteps = True
+
+    def bind(self, motion):
+        """Binds the integrator, and sets up the (cached) sequence of MTS
+        propagation steps."""
+
+        super(NVEIntegrator, self).bind(motion)
+
+        if daxpy is not None:
+            # daxpy only updates the momenta in place (rather than returning a
+            # new array) if they are stored as a contiguous float64 array,
+            # which also makes their flattened array a view
+            p = dstrip(self.beads.p)
+            if not (p.flags.c_contiguous and p.dtype == np.float64):
+                raise ValueError(
+                    "The bead momenta must be stored as a contiguous float64 array."
+                )
+
+        dself = dd(self)
+        dself.mts_schedule = depend_value(
+            name="mts_schedule",
+            func=self.get_mts_schedule,
+            dependencies=[dself.nmts, dself.pdt],
+        )
+
+    def pstep(self, level=0, dt=None):
+        """Velocity Verlet momentum propagator.
+
+        Args:
+            level: The MTS level of the forces to be integrated.
+            dt: The time step of the update. Defaults to pdt[level], but the
+                MTS schedule passes it as a plain number (possibly spanning
+                several merged steps) to avoid looking it up at every call.
+        """
 
         # halfdt/alpha
-        self.beads.p += self.forces.forces_mts(level) * self.pdt[level]
-        if level == 0:  # adds bias in the outer loop
-            self.beads.p += dstrip(self.bias.f) * self.pdt[level]
+        if dt is None:
+            dt = self.pdt[level]
+        # forces_mts returns a new array, so the bias can be accumulated in
+        # place, and the momenta are updated just once
+        fmts = self.forces.forces_mts(level)
+        # adds bias in the outer loop (if there is any, otherwise it is just zero)
+        if level == 0 and self.bias.nforces > 0:
+            fmts += dstrip(self.bias.f)
+        self.pkick(fmts, dt)
+
+    def qcstep(self, nsteps=1):
+        """Velocity Verlet centroid position propagator.
 
-    def qcstep(self):
-        """Velocity Verlet centroid position propagator."""
+        Args:
+            nsteps: The number of consecutive steps to be taken, which only
+                differ in the multiple of the time step, as neither qcstep nor
+                the exact and Cayley free_qstep change the centroid momentum.
+        """
         # dt/inmts
-        self.nm.qnm[0, :] += (
-            dstrip(self.nm.pnm)[0, :] / dstrip(self.beads.m3)[0] * self.qdt
-        )
+        dq = dstrip(self.nm.pnm)[0, :] * dstrip(self.qdt_on_m)
+        if nsteps > 1:
+            dq *= nsteps
+        self.nm.qnm[0, :] += dq
 
     # now the idea is that for BAOAB the MTS should work as follows:
     # take the BAB MTS, and insert the O in the very middle. This might imply breaking a A step in two, e.g. one could have
     # Bbabb(a/2) O (a/2)bbabB
-    def mtsprop_ba(self, index):
-        """ Recursive MTS step """
+    def get_mts_schedule(self):
+        """Unrolls the recursive MTS propagation into flat lists of calls.
+
+        Returns a list that contains, for each MTS level, a tuple with the
+        sequences of (argument-less) propagator calls that make up the BA and
+        the AB halves of the step at that level, and the full step. The
+        sequences are built from the innermost level outwards, so that each
+        level just splices in those of the level below. Momentum steps are
+        denoted by their level, and position steps by "q".
+        """
 
-        mk = int(self.nmts[index] / 2)
+        nmts = dstrip(self.nmts)
+        nlevels = len(nmts)
+        steps = [None] * nlevels
+        for index in reversed(range(nlevels)):
+            if index == nlevels - 1:
+                # Q propagation for dt/alpha at the inner step
+                qhalf_ba = qhalf_ab = ["q"]
+            else:
+                qhalf_ba, qhalf_ab = steps[index + 1]
+            qfull = qhalf_ba + qhalf_ab
+
+            mk = nmts[index] // 2
+            # do nmts/2 full sub-steps
+            ba = ([index] + qfull + [index]) * mk
+            ab = ([index] + qfull + [index]) * mk
+            if nmts[index] % 2 == 1:
+                # propagate p for dt/2alpha with force at level index
+                ba = ba + [index] + qhalf_ba
+                ab = qhalf_ab + [index] + ab
+            steps[index] = (ba, ab)
+
+        return [
+            (self._mts_calls(ba), self._mts_calls(ab), self._mts_calls(ba + ab))
+            for ba, ab in steps
+        ]
+
+    def _mts_calls(self, steps):
+        """Converts a sequence of MTS steps into propagator calls.
+
+        Consecutive momentum steps at the same level use the same force, so
+        (if the integrator allows it) they are merged into a single step with
+        a multiple of the time step. This is not done when there are
+        constraints, as the energy they remove after each kick would change
+        (even though the trajectory would not). Likewise, consecutive position
+        steps are merged into one, which saves half of the free ring polymer
+        propagations at the innermost level (except with the bab propagator,
+        which does not commute with qcstep). The constraints are only applied
+        after each momentum step if there are any to apply.
+        """
 
-        for i in range(mk):  # do nmts/2 full sub-steps
+        pcons = self._pcons_calls()
+
+        pdt = dstrip(self.pdt)
+        calls = []
+        for step, group in groupby(steps):
+            nsteps = len(list(group))
+            if step == "q":
+                if self.merge_qsteps and self.nm.propagator != "bab" and nsteps > 1:
+                    # qcstep only acts on the centroid, and the exact and
+                    # Cayley propagators only on the other normal modes, so
+                    # the two commute. The bab propagator moves all the beads
+                    # in Cartesian space and then undoes one qcstep with the
+                    # current centroid momentum, which (with bosons) it also
+                    # changes, so its steps are never merged
+                    calls += [
+                        partial(self.qcstep, nsteps),
+                        partial(self.nm.free_qstep, nsteps),
+                    ]
+                else:
+                    calls += [self.qcstep, self.nm.free_qstep] * nsteps
+            elif self.merge_psteps and not pcons and nsteps > 1:
+                calls += [partial(self.pstep, step, pdt[step] * nsteps)]
+            else:
+                calls += ([partial(self.pstep, step, pdt[step])] + pcons) * nsteps
+        return calls
 
-            self.pstep(index)
-            self.pconstraints()
-            if index == self.nmtslevels - 1:
-                # call Q propagation for dt/alpha at the inner step
-                self.qcstep()
-                self.nm.free_qstep()
-                self.qcstep()
-                self.nm.free_qstep()
+    def _pcons_calls(self):
+        """Returns the constraint calls to be made after each step that changes
+        the momenta, which are left out if there are no constraints to apply."""
 
-            else:
-                self.mtsprop(index + 1)
-
-            self.pstep(index)
-            self.pconstraints()
-
-        if self.nmts[index] % 2 == 1:
-            # propagate p for dt/2alpha with force at level index
-            self.pstep(index)
-            self.pconstraints()
-            if index == self.nmtslevels - 1:
-                # call Q propagation for dt/alpha at the inner step
-                self.qcstep()
-                self.nm.free_qstep()
-            else:
-                self.mtsprop_ba(index + 1)
+        if self.fixcom or len(self.fixatoms) > 0:
+            return [self.pconstraints]
+        else:
+            return []
 
-    def mtsprop_ab(self, index):
-        """ Recursive MTS step """
+    def mtsprop_ba(self, index):
+        """ MTS step, first half """
 
-        if self.nmts[index] % 2 == 1:
-            if index == self.nmtslevels - 1:
-                # call Q propagation for dt/alpha at the inner step
-                self.qcstep()
-                self.nm.free_qstep()
-            else:
-                self.mtsprop_ab(index + 1)
-
-            # propagate p for dt/2alpha with force at level index
-            self.pstep(index)
-            self.pconstraints()
-
-        for i in range(int(self.nmts[index] / 2)):  # do nmts/2 full sub-steps
-            self.pstep(index)
-            self.pconstraints()
-            if index == self.nmtslevels - 1:
-                # call Q propagation for dt/alpha at the inner step
-                self.qcstep()
-                self.nm.free_qstep()
-                self.qcstep()
-                self.nm.free_qstep()
-            else:
-                self.mtsprop(index + 1)
+        for op in self.mts_schedule[index][0]:
+            op()
+
+    def mtsprop_ab(self, index):
+        """ MTS step, second half """
 
-            self.pstep(index)
-            self.pconstraints()
+        for op in self.mts_schedule[index][1]:
+            op()
 
     def mtsprop(self, index):
-        # just calls the two pieces together
-        self.mtsprop_ba(index)
-        self.mtsprop_ab(index)
+        """ MTS step, both halves """
+
+        for op in self.mts_schedule[index][2]:
+            op()
 
     def step(self, step=None):
         """Does one simulation time step."""
@@ -513,33 +633,60 @@ class NVTIntegrator(NVEIntegrator):
         thermostat: A thermostat object to keep the temperature constant.
     """
 
+    def bind(self, motion):
+        """Binds the integrator, and sets up the (cached) sequence of calls
+        that make up a step with the chosen splitting."""
+
+        super(NVTIntegrator, self).bind(motion)
+
+        if self.splitting not in ("obabo", "baoab"):
+            raise ValueError(
+                "Invalid splitting requested. Only OBABO and BAOAB are supported."
+            )
+
+        dself = dd(self)
+        dself.step_calls = depend_value(
+            name="step_calls",
+            func=self.get_step_calls,
+            dependencies=[dself.splitting, dself.mts_schedule],
+        )
+
     def tstep(self):
         """Velocity Verlet thermostat step"""
 
         self.thermostat.step()
 
-    def step(self, step=None):
-        """Does one simulation time step."""
+    def get_step_calls(self):
+        """Returns the flat sequence of (argument-less) calls that make up a
+        step, splicing together the thermostat steps and the MTS schedule, so
+        that neither the splitting nor the MTS levels are looked up at every
+        step."""
 
         if self.splitting == "obabo":
-            # thermostat is applied for dt/2
-            self.tstep()
-            self.pconstraints()
+            return self.obabo_calls()
+        else:
+            return self.baoab_calls()
 
-            # forces are integerated for dt with MTS.
-            self.mtsprop(0)
+    def obabo_calls(self):
+        """Calls that make up a step with the OBABO splitting."""
 
-            # thermostat is applied for dt/2
-            self.tstep()
-            self.pconstraints()
+        # thermostat is applied for dt/2
+        ostep = [self.tstep] + self._pcons_calls()
+        # forces are integerated for dt with MTS.
+        return ostep + self.mts_schedule[0][2] + ostep
 
-        elif self.splitting == "baoab":
+    def baoab_calls(self):
+        """Calls that make up a step with the BAOAB splitting."""
 
-            self.mtsprop_ba(0)
-            # thermostat is applied for dt
-            self.tstep()
-            self.pconstraints()
-            self.mtsprop_ab(0)
+        ba, ab = self.mts_schedule[0][:2]
+        # thermostat is applied for dt
+        return ba + [self.tstep] + self._pcons_calls() + ab
+
+    def step(self, step=None):
+        """Does one simulation time step."""
+
+        for op in self.step_calls:
+            op()
 
 
 class NVTCCIntegrator(NVTIntegrator):
@@ -553,6 +700,20 @@ class NVTCCIntegrator(NVTIntegrator):
         thermostat: A thermostat object to keep the temperature constant.
     """
 
+    def bind(self, motion):
+        """Binds the integrator, and caches the inverse of the centroid
+        dynamical masses."""
+
+        super(NVTCCIntegrator, self).bind(motion)
+
+        dself = dd(self)
+        dself.idynm3c = depend_array(
+            name="idynm3c",
+            value=np.zeros(3 * self.beads.natoms, float),
+            func=lambda: 1.0 / dstrip(self.nm.dynm3)[0],
+            dependencies=[dd(self.nm).dynm3],
+        )
+
     def pstep(self):
         """Velocity Verlet momenta propagator."""
 
@@ -562,15 +723,19 @@ class NVTCCIntegrator(NVTIntegrator):
         # also adds the bias force
         # self.beads.p += dstrip(self.bias.f)*(self.dt*0.5)
 
+    def centroid_kin(self):
+        """Kinetic energy of the centroid, computed in a single reduction."""
+
+        pnmc = dstrip(self.nm.pnm)[0]
+        return 0.5 * np.einsum("i,i,i->", pnmc, pnmc, dstrip(self.idynm3c))
+
     def step(self, step=None):
         """Does one simulation time step."""
 
         self.thermostat.step()
         self.pconstraints()
         # NB we only have to take into account the energy balance of zeroing centroid velocity when we had added energy through the thermostat
-        self.ensemble.eens += 0.5 * np.dot(
-            self.nm.pnm[0], self.nm.pnm[0] / self.nm.dynm3[0]
-        )
+        self.ensemble.eens += self.centroid_kin()
         self.nm.pnm[0, :] = 0.0
 
         self.pstep()
@@ -585,9 +750,7 @@ class NVTCCIntegrator(NVTIntegrator):
         self.pconstraints()
 
         self.thermostat.step()
-        self.ensemble.eens += 0.5 * np.dot(
-            self.nm.pnm[0], self.nm.pnm[0] / self.nm.dynm3[0]
-        )
+        self.ensemble.eens += self.centroid_kin()
         self.nm.pnm[0, :] = 0.0
         self.pconstraints()
 
@@ -604,15 +767,20 @@ class NPTIntegrator(NVTIntegrator):
 
     # should be enough to redefine these functions, and the step() from NVTIntegrator should do the trick
 
-    def pstep(self, level=0):
+    # the barostat momentum step depends on the particle momenta, so it cannot be merged
+    merge_psteps = False
+    # the barostat position step also scales the cell, so it cannot be merged
+    merge_qsteps = False
+
+    def pstep(self, level=0, dt=None):
         """Velocity Verlet monemtum propagator."""
 
-        if np.array_equiv(self.forces.vir, np.zeros(len(self.forces.vir))):
+        if not np.any(dstrip(self.forces.vir)):
             raise ValueError(
                 "Seems like no stress tensor was computed by the client. Stopping barostat!"
             )
         self.barostat.pstep(level)
-        super(NPTIntegrator, self).pstep(level)
+        super(NPTIntegrator, self).pstep(level, dt)
         # self.pconstraints()
 
     def qcstep(self):
@@ -689,47 +857,52 @@ class SCIntegrator(NVTIntegrator):
         self.ensemble.add_econs(dd(self.forces).potsc)
         self.ensemble.add_xlpot(dd(self.forces).potsc)
 
-    def pstep(self, level=0):
+        # scratch space for the scaled bias, to avoid allocating a new array at every step
+        self._pstep_scratch = np.zeros(
+            (self.beads.nbeads, 3 * self.beads.natoms), float
+        )
+
+    def pstep(self, level=0, dt=None):
         """Velocity Verlet monemtum propagator."""
 
-        if level == 0:
-            # bias goes in the outer loop
-            self.beads.p += dstrip(self.bias.f) * self.pdt[level]
+        if dt is None:
+            dt = self.pdt[level]
         # just integrate the Trotter force scaled with the SC coefficients, which is a cheap approx to the SC force
-        self.beads.p += (
-            self.forces.forces_mts(level)
-            * (1.0 + self.forces.coeffsc_part_1)
-            * self.pdt[level]
-        )
+        # forces_mts returns a new array, so it can be scaled in place (the per-bead coefficients
+        # are combined with the time step first) and added to the momenta in a single pass
+        fmts = self.forces.forces_mts(level)
+        fmts *= (1.0 + dstrip(self.forces.coeffsc_part_1)) * dt
+        if level == 0 and self.bias.nforces > 0:
+            # bias goes in the outer loop, and is not scaled with the SC coefficients
+            np.multiply(dstrip(self.bias.f), dt, out=self._pstep_scratch)
+            fmts += self._pstep_scratch
+        self.pkick(fmts)
 
-    def step(self, step=None):
+    def pscstep(self):
+        """Velocity Verlet momentum propagator for the |f|^2 part of the SC force."""
 
-        # the |f|^2 term is considered to be slowest (for large enough P) and is integrated outside everything.
-        # if nmts is not specified, this is just the same as doing the full SC integration
+        # dt/2
+        self.pkick(dstrip(self.forces.fsc_part_2), self.dt * 0.5)
 
-        if self.splitting == "obabo":
-            # thermostat is applied for dt/2
-            self.tstep()
-            self.pconstraints()
+    # the |f|^2 term is considered to be slowest (for large enough P) and is integrated outside everything.
+    # if nmts is not specified, this is just the same as doing the full SC integration
 
-            # forces are integerated for dt with MTS.
-            self.beads.p += dstrip(self.forces.fsc_part_2) * self.dt * 0.5
-            self.mtsprop(0)
-            self.beads.p += dstrip(self.forces.fsc_part_2) * self.dt * 0.5
+    def obabo_calls(self):
+        """Calls that make up a step with the OBABO splitting."""
 
-            # thermostat is applied for dt/2
-            self.tstep()
-            self.pconstraints()
+        # thermostat is applied for dt/2
+        ostep = [self.tstep] + self._pcons_calls()
+        pscstep = [self.pscstep]
+        # forces are integerated for dt with MTS.
+        return ostep + pscstep + self.mts_schedule[0][2] + pscstep + ostep
 
-        elif self.splitting == "baoab":
+    def baoab_calls(self):
+        """Calls that make up a step with the BAOAB splitting."""
 
-            self.beads.p += dstrip(self.forces.fsc_part_2) * self.dt * 0.5
-            self.mtsprop_ba(0)
-            # thermostat is applied for dt
-            self.tstep()
-            self.pconstraints()
-            self.mtsprop_ab(0)
-            self.beads.p += dstrip(self.forces.fsc_part_2) * self.dt * 0.5
+        ba, ab = self.mts_schedule[0][:2]
+        pscstep = [self.pscstep]
+        # thermostat is applied for dt
+        return pscstep + ba + [self.tstep] + self._pcons_calls() + ab + pscstep
 
 
 class SCNPTIntegrator(SCIntegrator):
@@ -742,16 +915,22 @@ class SCNPTIntegrator(SCIntegrator):
     """
 
     # should be enough to redefine these functions, and the step() from NVTIntegrator should do the trick
-    def pstep(self, level=0):
+
+    # the barostat momentum step depends on the particle momenta, so it cannot be merged
+    merge_psteps = False
+    # the barostat position step also scales the cell, so it cannot be merged
+    merge_qsteps = False
+
+    def pstep(self, level=0, dt=None):
         """Velocity Verlet monemtum propagator."""
 
-        if np.array_equiv(self.forces.vir, np.zeros(len(self.forces.vir))):
+        if not np.any(dstrip(self.forces.vir)):
             raise ValueError(
                 "Seems like no stress tensor was computed by the client. Stopping barostat!"
             )
 
         self.barostat.pstep(level)
-        super(SCNPTIntegrator, self).pstep(level)
+        super(SCNPTIntegrator, self).pstep(level, dt)
 
     def qcstep(self):
         """Velocity Verlet centroid position propagator."""
@@ -764,35 +943,22 @@ class SCNPTIntegrator(SCIntegrator):
         self.thermostat.step()
         self.barostat.thermostat.step()
 
-    def step(self, step=None):
-
-        # the |f|^2 term is considered to be slowest (for large enough P) and is integrated outside everything.
-        # if nmts is not specified, this is just the same as doing the full SC integration
+    # the |f|^2 term is considered to be slowest (for large enough P) and is integrated outside everything.
+    # if nmts is not specified, this is just the same as doing the full SC integration
 
-        if self.splitting == "obabo":
-            # thermostat is applied for dt/2
-            self.tstep()
-            self.pconstraints()
+    def obabo_calls(self):
+        """Calls that make up a step with the OBABO splitting."""
 
-            # forces are integerated for dt with MTS.
-            self.barostat.pscstep()
-            self.beads.p += dstrip(self.forces.fsc_part_2) * self.dt * 0.5
-            self.mtsprop(0)
-            self.barostat.pscstep()
-            self.beads.p += dstrip(self.forces.fsc_part_2) * self.dt * 0.5
+        # thermostat is applied for dt/2
+        ostep = [self.tstep] + self._pcons_calls()
+        pscstep = [self.barostat.pscstep, self.pscstep]
+        # forces are integerated for dt with MTS.
+        return ostep + pscstep + self.mts_schedule[0][2] + pscstep + ostep
 
-            # thermostat is applied for dt/2
-            self.tstep()
-            self.pconstraints()
-
-        elif self.splitting == "baoab":
+    def baoab_calls(self):
+        """Calls that make up a step with the BAOAB splitting."""
 
-            self.barostat.pscstep()
-            self.beads.p += dstrip(self.forces.fsc_part_2) * self.dt * 0.5
-            self.mtsprop_ba(0)
-            # thermostat is applied for dt
-            self.tstep()
-            self.pconstraints()
-            self.mtsprop_ab(0)
-            self.barostat.pscstep()
-            self.beads.p += dstrip(self.forces.fsc_part_2) * self.dt * 0.5
+        ba, ab = self.mts_schedule[0][:2]
+        pscstep = [self.barostat.pscstep, self.pscstep]
+        # thermostat is applied for dt
+        return pscstep + ba + [self.tstep] + self._pcons_calls() + ab + pscstep
@@ -323,6 +323,19 @@ class NormalModes(dobject):
                 dself.propagator,
             ],
         )
+        # propagators for two consecutive steps, as done in the inner MTS loop
+        dself.prop_pq2 = depend_array(
+            name="prop_pq2",
+            value=np.zeros((self.beads.nbeads, 2, 2)),
+            func=lambda: np.matmul(dstrip(self.prop_pq), dstrip(self.prop_pq)),
+            dependencies=[dself.prop_pq],
+        )
+        dself.o_prop_pq2 = depend_array(
+            name="o_prop_pq2",
+            value=np.zeros((self.beads.nbeads, 2, 2)),
+            func=lambda: np.matmul(dstrip(self.o_prop_pq), dstrip(self.o_prop_pq)),
+            dependencies=[dself.o_prop_pq],
+        )
 
         # if the mass matrix is not the RPMD one, the MD kinetic energy can't be
         # obtained in the bead representation because the masses are all mixed up
@@ -777,7 +790,7 @@ class NormalModes(dobject):
                 # the forces at the updated positions.
                 self.beads.p += 0.5 * dt * self.fspring
 
-    def free_qstep(self):
+    def free_qstep(self, nsteps=1):
         # !BH!: Should we update the comment here that now the propagator is either exact, NM or numerical, Cartesian?
         """Exact normal mode propagator for the free ring polymer.
 
@@ -789,8 +802,19 @@ class NormalModes(dobject):
 
         Also note that the centroid coordinate is propagated in qcstep, so is
         not altered here.
+
+        Args:
+            nsteps: The number of consecutive steps to be taken, either one or
+                two (the most the MTS schedule merges). The exact and Cayley
+                propagators are linear, so two steps are done in a single pass
+                using the (cached) squares of the propagator matrices.
         """
 
+        if nsteps not in (1, 2):
+            raise ValueError(
+                "The free ring polymer propagator can only take one or two steps at a time."
+            )
+
         if self.nbeads == 1:
             pass
 
@@ -801,7 +825,8 @@ class NormalModes(dobject):
                     "@Normalmodes : Open path propagator not implemented for bosons. Feel free to implement it if you want to use it :) "
                 )
 
-            self.free_babstep()
+            for i in range(nsteps):
+                self.free_babstep()
 
         else:
             if len(self.bosons) > 0:
@@ -811,8 +836,12 @@ class NormalModes(dobject):
 
             pq = np.zeros((2, self.natoms * 3), float)
             sm = dstrip(self.beads.sm3)
-            prop_pq = dstrip(self.prop_pq)
-            o_prop_pq = dstrip(self.o_prop_pq)
+            if nsteps == 2:
+                prop_pq = dstrip(self.prop_pq2)
+                o_prop_pq = dstrip(self.o_prop_pq2)
+            else:
+                prop_pq = dstrip(self.prop_pq)
+                o_prop_pq = dstrip(self.o_prop_pq)
             pnm = dstrip(self.pnm) / sm
             qnm = dstrip(self.qnm) * sm
 
@@ -808,7 +808,7 @@ def dpipe(dfrom, dto, item=-1):
     """
 
     if item < 0:
-        dto._func = lambda: dfrom.get()
+        dto._func = dfrom.get
     else:
         dto._func = lambda i=item: dfrom.__getitem__(i)
     dto.add_dependency(dfrom)
@@ -0,0 +1,177 @@
+"""Tests the cached MTS schedule of the dynamics integrators."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import numpy as np
+import pytest
+
+from ipi.engine.motion.dynamics import NVEIntegrator
+from ipi.utils.depend import dd, depend_array, depend_value
+
+nmts_list = [[1], [2], [3], [2, 3], [3, 2], [3, 2, 1], [4, 1, 3]]
+
+
+class RecordingNM(object):
+    """Stand-in for the normal modes object, which logs the free steps."""
+
+    propagator = "exact"
+
+    def __init__(self, log):
+        self.log = log
+
+    def free_qstep(self, nsteps=1):
+        self.log.append(("f", nsteps))
+
+
+class RecordingIntegrator(NVEIntegrator):
+    """NVE integrator that logs the propagator calls instead of doing them."""
+
+    def pstep(self, level=0, dt=None):
+        self.log.append(("p", level, dt))
+
+    def qcstep(self, nsteps=1):
+        self.log.append(("q", nsteps))
+
+    def pconstraints(self):
+        self.log.append(("c",))
+
+
+def get_integrator(nmts, constraints, merge_qsteps):
+    """Sets up just the parts of an integrator needed to build the schedule."""
+
+    integrator = RecordingIntegrator()
+    integrator.log = []
+    integrator.nm = RecordingNM(integrator.log)
+    integrator.fixcom = constraints
+    integrator.fixatoms = np.zeros(0, int)
+    integrator.merge_qsteps = merge_qsteps
+
+    dself = dd(integrator)
+    dself.nmts = depend_array(name="nmts", value=np.asarray(nmts, int))
+    dself.pdt = depend_array(
+        name="pdt", value=np.cumprod(1.0 / np.asarray(nmts, float)) * 0.5
+    )
+    dself.mts_schedule = depend_value(
+        name="mts_schedule",
+        func=integrator.get_mts_schedule,
+        dependencies=[dself.nmts, dself.pdt],
+    )
+
+    return integrator
+
+
+def recursive_calls(nmts, pdt, constraints):
+    """Reference call sequences of the (former) recursive MTS propagation."""
+
+    log = []
+    nlevels = len(nmts)
+
+    def pstep(index):
+        log.append(("p", index, pdt[index]))
+        if constraints:
+            log.append(("c",))
+
+    def qstep():
+        log.append(("q", 1))
+        log.append(("f", 1))
+
+    def mtsprop_ba(index):
+        for i in range(nmts[index] // 2):
+            pstep(index)
+            if index == nlevels - 1:
+                qstep()
+                qstep()
+            else:
+                mtsprop(index + 1)
+            pstep(index)
+        if nmts[index] % 2 == 1:
+            pstep(index)
+            if index == nlevels - 1:
+                qstep()
+            else:
+                mtsprop_ba(index + 1)
+
+    def mtsprop_ab(index):
+        if nmts[index] % 2 == 1:
+            if index == nlevels - 1:
+                qstep()
+            else:
+                mtsprop_ab(index + 1)
+            pstep(index)
+        for i in range(nmts[index] // 2):
+            pstep(index)
+            if index == nlevels - 1:
+                qstep()
+                qstep()
+            else:
+                mtsprop(index + 1)
+            pstep(index)
+
+    def mtsprop(index):
+        mtsprop_ba(index)
+        mtsprop_ab(index)
+
+    calls = []
+    for prop in (mtsprop_ba, mtsprop_ab, mtsprop):
+        del log[:]
+        prop(0)
+        calls.append(list(log))
+    return calls
+
+
+def unmerge(log, pdt):
+    """Expands merged momentum and position steps into single steps."""
+
+    calls = []
+    i = 0
+    while i < len(log):
+        call = log[i]
+        if call[0] == "p":
+            nsteps = int(round(call[2] / pdt[call[1]]))
+            calls += [("p", call[1], pdt[call[1]])] * nsteps
+        elif call[0] == "q":
+            assert log[i + 1] == ("f", call[1])
+            calls += [("q", 1), ("f", 1)] * call[1]
+            i += 1
+        else:
+            calls.append(call)
+        i += 1
+    return calls
+
+
+def run_schedule(integrator):
+    """Runs the BA, AB and full MTS steps, and returns the logged calls."""
+
+    calls = []
+    for prop in (integrator.mtsprop_ba, integrator.mtsprop_ab, integrator.mtsprop):
+        del integrator.log[:]
+        prop(0)
+        calls.append(list(integrator.log))
+    return calls
+
+
+@pytest.mark.parametrize("nmts", nmts_list)
+def test_mts_schedule_order(nmts):
+    """Without merging, the schedule follows the recursive MTS propagation."""
+
+    integrator = get_integrator(nmts, constraints=True, merge_qsteps=False)
+    pdt = dd(integrator).pdt.view(np.ndarray)
+
+    assert run_schedule(integrator) == recursive_calls(nmts, pdt, True)
+
+
+@pytest.mark.parametrize("nmts", nmts_list)
+def test_mts_schedule_merged(nmts):
+    """Merged steps add up to the recursive MTS propagation."""
+
+    integrator = get_integrator(nmts, constraints=False, merge_qsteps=True)
+    pdt = dd(integrator).pdt.view(np.ndarray)
+
+    logs = run_schedule(integrator)
+    # free_qstep only takes one or two steps at a time
+    assert all(call[1] <= 2 for log in logs for call in log if call[0] == "f")
+    calls = [unmerge(log, pdt) for log in logs]
+    assert calls == recursive_calls(nmts, pdt, False)
@@ -0,0 +1,111 @@
+"""Tests the free ring polymer propagation of the NormalModes object."""
+
+# This file is part of i-PI.
+# i-PI Copyright (C) 2014-2015 i-PI developers
+# See the "licenses" directory for full license information.
+
+
+import numpy as np
+import pytest
+
+from ipi.engine.beads import Beads
+from ipi.engine.motion.dynamics import NVEIntegrator
+from ipi.engine.normalmodes import NormalModes
+from ipi.utils.depend import dd, dobject, depend_array, depend_value, dstrip
+
+
+class Holder(dobject):
+    """Stand-in for the ensemble and motion objects NormalModes binds to."""
+
+
+def get_normalmodes(propagator, bosons=None, natoms=3, nbeads=4):
+    """Sets up a bound NormalModes object, with random positions and momenta.
+
+    Bosons are given the mass of a proton, and their ring polymers are put close
+    enough to each other that the exchange terms of the spring forces matter.
+    """
+
+    prng = np.random.RandomState(12345)
+
+    beads = Beads(natoms, nbeads)
+    if bosons:
+        beads.m = np.full(natoms, 1836.15)
+        beads.q = (
+            prng.normal(size=3 * natoms) * 0.5
+            + prng.normal(size=(nbeads, 3 * natoms)) * 0.3
+        )
+    else:
+        beads.m = prng.uniform(1.0, 20.0, natoms) * 1822.888
+        beads.q = prng.normal(size=(nbeads, 3 * natoms))
+    beads.p = prng.normal(size=(nbeads, 3 * natoms)) * 10.0
+
+    ensemble = Holder()
+    dd(ensemble).temp = depend_value(name="temp", value=1e-3)
+    motion = Holder()
+    dd(motion).dt = depend_value(name="dt", value=20.0)
+
+    nm = NormalModes(propagator=propagator, bosons=bosons)
+    nm.bind(ensemble, motion, beads=beads)
+    return nm
+
+
+def get_integrator(nm):
+    """Sets up just the parts of an integrator needed for the position steps."""
+
+    integrator = NVEIntegrator()
+    integrator.nm = nm
+    integrator.fixcom = False
+    integrator.fixatoms = np.zeros(0, int)
+    integrator.merge_qsteps = True
+    integrator.qdt_on_m = nm.dt / dstrip(nm.beads.m3)[0]
+    dd(integrator).pdt = depend_array(name="pdt", value=np.zeros(1))
+    return integrator
+
+
+@pytest.mark.parametrize("propagator", ["exact", "cayley", "bab"])
+def test_free_qstep_nsteps(propagator):
+    """free_qstep(2) is the same as two calls to free_qstep()."""
+
+    nm_one = get_normalmodes(propagator)
+    nm_two = get_normalmodes(propagator)
+
+    nm_one.free_qstep()
+    nm_one.free_qstep()
+    nm_two.free_qstep(2)
+
+    assert np.allclose(dstrip(nm_one.qnm), dstrip(nm_two.qnm), rtol=1e-10, atol=0)
+    assert np.allclose(dstrip(nm_one.pnm), dstrip(nm_two.pnm), rtol=1e-10, atol=0)
+    # the propagation actually does something
+    assert not np.allclose(dstrip(nm_one.qnm), dstrip(get_normalmodes(propagator).qnm))
+
+
+@pytest.mark.parametrize("nsteps", [0, 3])
+def test_free_qstep_nsteps_rejected(nsteps):
+    """free_qstep only takes one or two steps at a time."""
+
+    nm = get_normalmodes("exact")
+    with pytest.raises(ValueError):
+        nm.free_qstep(nsteps)
+
+
+@pytest.mark.parametrize(
+    "propagator, bosons",
+    [("exact", None), ("cayley", None), ("bab", None), ("bab", [0, 1, 2])],
+)
+def test_merged_qsteps(propagator, bosons):
+    """Two position steps, as merged by the MTS schedule, are the same as
+    alternating qcstep and free_qstep twice."""
+
+    nm_one = get_normalmodes(propagator, bosons)
+    nm_two = get_normalmodes(propagator, bosons)
+    integrator_one = get_integrator(nm_one)
+    integrator_two = get_integrator(nm_two)
+
+    for i in range(2):
+        integrator_one.qcstep()
+        nm_one.free_qstep()
+    for op in integrator_two._mts_calls(["q", "q"]):
+        op()
+
+    assert np.allclose(dstrip(nm_one.qnm), dstrip(nm_two.qnm), rtol=1e-10, atol=0)
+    assert np.allclose(dstrip(nm_one.pnm), dstrip(nm_two.pnm), rtol=1e-10, atol=0)